@@ -1,34 +1,58 @@
-from flask import Flask, jsonify, request
+import os
+
+import orjson
+from flask import Flask, request
 from flask_cors import CORS
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 
-from classes import OptimizeRequest, FitRequest
-from service import optimize_with_sympy, fit_linear
+from classes import (
+    OptimizeRequest,
+    OptimizeBatchRequest,
+    FitRequest,
+    parse_fit_columns,
+)
+from service import optimize_with_sympy, optimize_batch_request, fit_linear
 
 
 app = Flask(__name__)
 
 #CORS liberando requisições vindas do front em http://127.0.0.1:8000
+# (origin é só esquema + host + porta, sem caminho da página)
 CORS(
     app,
-    resources={r"/*": {"origins": ["http://127.0.0.1:8000/Op.html", "http://localhost:8000/Op.html"]}},
+    resources={r"/*": {"origins": ["http://127.0.0.1:8000", "http://localhost:8000"]}},
+    allow_headers=["Content-Type", "Authorization"],
+    methods=["GET", "POST", "OPTIONS"],
 )
 
 
+# Validadores construídos uma vez (pydantic-core) e reutilizados por request
+OPT_ADAPTER = TypeAdapter(OptimizeRequest)
+OPT_BATCH_ADAPTER = TypeAdapter(OptimizeBatchRequest)
+FIT_ADAPTER = TypeAdapter(FitRequest)
+
+
+def json_response(payload, status: int = 200):
+    return app.response_class(
+        orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json',
+    )
+
+
 def error_response(message: str, status_code: int):
-    return jsonify({"error": message}), status_code
+    return json_response({"error": message}, status_code)
 
 
 # --------------------------------------------------
-# Middleware para garantir headers de CORS em TODAS
-# as respostas (incluindo erros)
+# Preflight (OPTIONS) respondido antes de chegar na view
+# (rotas inexistentes seguem para o 404 normal);
+# os headers de CORS são aplicados pelo flask-cors
 # --------------------------------------------------
-@app.after_request
-def add_cors_headers(response):
-    response.headers["Access-Control-Allow-Origin"] = "http://127.0.0.1:8000"
-    response.headers["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
-    return response
+@app.before_request
+def _cors_preflight():
+    if request.method == 'OPTIONS' and request.url_rule is not None:
+        return ('', 204)
 
 
 # ---------------------- OTIMIZAÇÃO ---------------------- #
@@ -48,20 +72,17 @@ def post_optimize():
           "pMax": ...
         }
     """
-    # Trata o preflight (OPTIONS) manualmente
-    if request.method == 'OPTIONS':
-        # só precisa devolver 204/200 com os headers já setados em after_request
-        return '', 204
-
     try:
-        data = request.get_json()
+        data = orjson.loads(request.get_data(cache=False))
         if data is None:
             return error_response("Corpo JSON ausente ou inválido.", 422)
 
-        req = OptimizeRequest(**data)
+        req = OPT_ADAPTER.validate_python(data)
         res = optimize_with_sympy(req)
-        return jsonify(res.model_dump())
+        return json_response(res)
 
+    except orjson.JSONDecodeError:
+        return error_response("Corpo JSON ausente ou inválido.", 422)
     except ValidationError as e:
         return error_response(str(e), 422)
     except Exception as e:
@@ -70,6 +91,39 @@ def post_optimize():
         return error_response(str(e), 500)
 
 
+@app.route('/optimize/batch', methods=['POST', 'OPTIONS'])
+def post_optimize_batch():
+    """
+    POST /optimize/batch
+
+    Corpo (JSON): listas do mesmo tamanho, um cenário por índice.
+        {
+          "alpha": [...],
+          "beta": [...],
+          "c": [...],
+          "F": [...],
+          "pMin": [...],
+          "pMax": [...]
+        }
+    """
+    try:
+        data = orjson.loads(request.get_data(cache=False))
+        if data is None:
+            return error_response("Corpo JSON ausente ou inválido.", 422)
+
+        req = OPT_BATCH_ADAPTER.validate_python(data)
+        res = optimize_batch_request(req)
+        return json_response(res)
+
+    except orjson.JSONDecodeError:
+        return error_response("Corpo JSON ausente ou inválido.", 422)
+    except ValidationError as e:
+        return error_response(str(e), 422)
+    except Exception as e:
+        print("Erro /optimize/batch:", e)
+        return error_response(str(e), 500)
+
+
 # ---------------------- AJUSTE DA DEMANDA ---------------------- #
 
 @app.route('/fit', methods=['POST', 'OPTIONS'])
@@ -85,19 +139,33 @@ def post_fit():
             ...
           ]
         }
-    """
-    if request.method == 'OPTIONS':
-        return '', 204
 
+    ou, em colunas:
+        {
+          "prices": [180, 200, ...],
+          "quantities": [220, 190, ...]
+        }
+    """
     try:
-        data = request.get_json()
+        data = orjson.loads(request.get_data(cache=False))
         if data is None:
             return error_response("Corpo JSON ausente ou inválido.", 422)
 
-        req = FitRequest(**data)
-        res = fit_linear(req.data)
-        return jsonify(res.model_dump())
-
+        # Formato em colunas: vai direto para np.ndarray, sem passar pelo Pydantic
+        if isinstance(data, dict) and data.keys() == {"prices", "quantities"}:
+            try:
+                prices, quantities = parse_fit_columns(data["prices"], data["quantities"])
+            except ValueError as e:
+                return error_response(str(e), 422)
+            res = fit_linear(prices, quantities)
+            return json_response(res.model_dump())
+
+        req = FIT_ADAPTER.validate_python(data)
+        res = fit_linear(req.prices, req.quantities)
+        return json_response(res.model_dump())
+
+    except orjson.JSONDecodeError:
+        return error_response("Corpo JSON ausente ou inválido.", 422)
     except ValidationError as e:
         return error_response(str(e), 422)
     except Exception as e:
@@ -107,16 +175,13 @@ def post_fit():
 
 @app.route("/ping", methods=['GET', 'OPTIONS'])
 def ping():
-    if request.method == 'OPTIONS':
-        return '', 204
-    return jsonify({"status": "ok"})
+    return json_response({"status": "ok"})
 
 @app.route("/teste", methods=['GET', 'OPTIONS'])
 def index():
-    if request.method == 'OPTIONS':
-        return '', 204
-    return jsonify({"message": "Welcome to the Optimization API"})
+    return json_response({"message": "Welcome to the Optimization API"})
 
 
 if __name__ == "__main__":
-    app.run(port=5000, host='localhost', debug=True)
+    # Servidor de desenvolvimento; em produção use: gunicorn app:app
+    app.run(port=5000, host='localhost', debug=os.environ.get("FLASK_DEBUG") == "1")
@@ -1,5 +1,13 @@
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import Annotated, List, Optional
+import numpy as np
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    ValidationInfo,
+    field_validator,
+    model_validator,
+)
 
 
 class OptimizeRequest(BaseModel):
@@ -24,6 +32,7 @@ class OptimizeRequest(BaseModel):
 class Derivation(BaseModel):
     """
     Representa a derivação simbólica da função lucro, para uso em relatório/explicação.
+    (Só documenta o formato da resposta; o serviço devolve um dict.)
     """
     objective: str       # π(p)
     d1: str              # π'(p)
@@ -39,6 +48,7 @@ class Derivation(BaseModel):
 class OptimizeResponse(BaseModel):
     """
     Resultado numérico da otimização.
+    (Só documenta o formato da resposta; o serviço devolve um dict.)
     """
     pOpt: float          # preço ótimo
     qOpt: float          # quantidade ótima
@@ -50,19 +60,122 @@ class OptimizeResponse(BaseModel):
     derivation: Optional[Derivation] = None
 
 
-class FitPoint(BaseModel):
+class OptimizeBatchRequest(BaseModel):
     """
-    Um ponto de dado real (preço, quantidade).
+    Entrada para a otimização em lote (varreduras de parâmetros / Monte Carlo).
+
+    Cada campo é uma lista; o cenário i é formado pelos i-ésimos elementos.
+    """
+
+    alpha: List[Annotated[float, Field(ge=0, allow_inf_nan=False)]]
+    beta: List[Annotated[float, Field(gt=0, allow_inf_nan=False)]]
+    c: List[Annotated[float, Field(ge=0, allow_inf_nan=False)]]
+    F: List[Annotated[float, Field(ge=0, allow_inf_nan=False)]]
+    pMin: List[Annotated[float, Field(ge=0, allow_inf_nan=False)]]
+    pMax: List[Annotated[float, Field(ge=0, allow_inf_nan=False)]]
+
+    @model_validator(mode="after")
+    def _check_scenarios(self):
+        cols = (self.alpha, self.beta, self.c, self.F, self.pMin, self.pMax)
+        if len({len(col) for col in cols}) != 1:
+            raise ValueError("Todas as listas devem ter o mesmo tamanho.")
+        if (np.asarray(self.pMin) > np.asarray(self.pMax)).any():
+            raise ValueError("pMax deve ser >= pMin.")
+        return self
+
+
+class OptimizeBatchResponse(BaseModel):
+    """
+    Resultado numérico da otimização em lote (um elemento por cenário).
+    (Só documenta o formato da resposta; o serviço devolve um dict.)
     """
-    price: float
-    quantity: float
+    pOpt: List[float]
+    qOpt: List[float]
+    profitOpt: List[float]
+    revenue: List[float]
+    margin: List[float]
+    elasticity: List[float]
+    usedBoundary: List[bool]
+
+
+def to_float_column(v, name: str) -> np.ndarray:
+    """
+    Converte uma lista (JSON) em np.ndarray[float64] 1-D com valores finitos.
+    Levanta ValueError se a entrada não for uma lista de números.
+    """
+    try:
+        arr = np.asarray(v, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} deve ser uma lista de números.")
+    if arr.ndim != 1:
+        raise ValueError(f"{name} deve ser uma lista de números.")
+    if not np.isfinite(arr).all():
+        raise ValueError("Valores devem ser números finitos.")
+    return arr
+
+
+def check_fit_columns(prices: np.ndarray, quantities: np.ndarray) -> None:
+    """
+    Regras do ajuste sobre as duas colunas: mesmo tamanho e pelo menos 2 pares.
+    """
+    if prices.shape != quantities.shape:
+        raise ValueError("prices e quantities devem ter o mesmo tamanho.")
+    if prices.size < 2:
+        raise ValueError("Forneça pelo menos 2 pares (preço, quantidade).")
+
+
+def parse_fit_columns(prices, quantities):
+    """
+    Validação do formato em colunas sem passar pelo Pydantic (caminho rápido
+    do /fit). Mesmas regras do FitRequest; levanta ValueError.
+    """
+    p = to_float_column(prices, "prices")
+    q = to_float_column(quantities, "quantities")
+    check_fit_columns(p, q)
+    return p, q
 
 
 class FitRequest(BaseModel):
     """
     Requisição para ajuste da curva de demanda.
+
+    Aceita dois formatos:
+        {"data": [{"price": ..., "quantity": ...}, ...]}   (lista de pontos)
+        {"prices": [...], "quantities": [...]}             (colunas)
+
+    Em ambos os casos os dados ficam em req.prices / req.quantities
+    como np.ndarray[float64], sem criar um objeto por ponto.
     """
-    data: List[FitPoint]
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    prices: np.ndarray
+    quantities: np.ndarray
+
+    @model_validator(mode="before")
+    @classmethod
+    def _points_to_columns(cls, values):
+        if not isinstance(values, dict) or "data" not in values:
+            return values
+
+        pontos = values["data"]
+        if not isinstance(pontos, list):
+            raise ValueError("data deve ser uma lista de {price, quantity}.")
+        try:
+            prices = [pt["price"] for pt in pontos]
+            quantities = [pt["quantity"] for pt in pontos]
+        except (TypeError, KeyError):
+            raise ValueError("Cada ponto deve ter os campos price e quantity.")
+        return {"prices": prices, "quantities": quantities}
+
+    @field_validator("prices", "quantities", mode="before")
+    @classmethod
+    def _to_float_array(cls, v, info: ValidationInfo):
+        return to_float_column(v, info.field_name)
+
+    @model_validator(mode="after")
+    def _check_columns(self):
+        check_fit_columns(self.prices, self.quantities)
+        return self
 
 
 class FitResponse(BaseModel):
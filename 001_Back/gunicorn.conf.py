@@ -0,0 +1,15 @@
+import multiprocessing
+import os
+
+# Configuração do gunicorn (carregada automaticamente por: gunicorn app:app)
+
+bind = os.environ.get("BIND", "127.0.0.1:5000")
+
+# Um processo por núcleo, cada um com algumas threads
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = 4
+
+# Importa app/service (modelo simbólico, JIT) uma vez no master e
+# compartilha com os workers via fork
+preload_app = True
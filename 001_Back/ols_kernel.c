@@ -0,0 +1,33 @@
+/*
+ * Kernel OLS em uma passada (Welford), alternativa ao _ols_one_pass do Numba.
+ *
+ * Compilar (na pasta do backend):
+ *     gcc -O3 -ffast-math -march=native -shared -fPIC ols_kernel.c -o libols.so
+ *
+ * service.py carrega libols.so via ctypes se o arquivo existir.
+ *
+ * out5 = { média de p, média de q, Cpp, Cpq, Cqq }
+ */
+#include <stddef.h>
+
+void ols(const double *p, const double *q, size_t n, double *out5)
+{
+    double mp = 0.0, mq = 0.0;
+    double Cpp = 0.0, Cpq = 0.0, Cqq = 0.0;
+
+    for (size_t i = 0; i < n; i++) {
+        double dp = p[i] - mp;
+        double dq = q[i] - mq;
+        mp += dp / (double)(i + 1);
+        mq += dq / (double)(i + 1);
+        Cpp += dp * (p[i] - mp);
+        Cpq += dp * (q[i] - mq);
+        Cqq += dq * (q[i] - mq);
+    }
+
+    out5[0] = mp;
+    out5[1] = mq;
+    out5[2] = Cpp;
+    out5[3] = Cpq;
+    out5[4] = Cqq;
+}
@@ -1,19 +1,24 @@
-from typing import List
-from sympy import symbols, diff, Eq, solve, simplify, latex
+import ctypes
+import json
+import math
+import os
+from functools import lru_cache
+from pathlib import Path
+import numpy as np
+from numba import njit
 from werkzeug.exceptions import BadRequest
 
 from classes import (
     OptimizeRequest,
-    OptimizeResponse,
-    FitPoint,
+    OptimizeBatchRequest,
     FitResponse,
-    Derivation,
 )
 
 
 # ----------------------------------------------------------------------
 # Parte simbólica: constrói q(p), π(p), π'(p), π''(p) e p*
 # ----------------------------------------------------------------------
+@lru_cache(maxsize=None)
 def _build_symbolic_model():
     """
     Constrói, simbolicamente, o modelo:
@@ -23,7 +28,12 @@ def _build_symbolic_model():
 
     E deriva:
         π'(p), π''(p), p* (ótimo interno, solução de π'(p)=0).
+
+    O SymPy só é importado aqui: o caminho de request usa apenas as
+    strings da derivação (ver _load_derivation_strings).
     """
+    from sympy import symbols, diff
+
     p = symbols("p", real=True)
     alpha, beta, c, F = symbols("alpha beta c F", real=True)
 
@@ -37,121 +47,275 @@ def _build_symbolic_model():
     dpi = diff(pi, p)
     d2 = diff(dpi, p)
 
-    # p* tal que π'(p*) = 0
-    p_star_solutions = solve(Eq(dpi, 0), p)
-    p_star_expr = simplify(p_star_solutions[0]) if p_star_solutions else None
+    # p* tal que π'(p*) = 0: π'(p) = a + b*p é afim em p,
+    # então a raiz é a/(-b) (com b = π''(p)), sem passar pelo solve.
+    # Escrito assim o SymPy já monta (alpha + beta*c)/(2*beta), sem simplify
+    p_star_expr = dpi.subs(p, 0) / (-d2)
 
     return {
         "syms": (p, alpha, beta, c, F),
-        "q": simplify(q),
-        "pi": simplify(pi),
-        "dpi": simplify(dpi),
-        "d2": simplify(d2),
-        "p_star": simplify(p_star_expr) if p_star_expr is not None else None,
+        "q": q,
+        "pi": pi,
+        "dpi": dpi,
+        "d2": d2,
+        "p_star": p_star_expr,
     }
 
 
-SYMS = _build_symbolic_model()
+def __getattr__(name):
+    # SYMS continua disponível para experimentos (from service import SYMS),
+    # mas só é construído quando alguém pede
+    if name == "SYMS":
+        return _build_symbolic_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+DERIVATION_PATH = Path(__file__).with_name("derivation.json")
+
+
+def _compute_derivation_strings():
+    """
+    Gera as strings (texto e LaTeX) da derivação a partir do modelo simbólico.
+    """
+    from sympy import latex
+
+    syms = _build_symbolic_model()
+    return dict(
+        objective=str(syms["pi"]),
+        d1=str(syms["dpi"]),
+        d2=str(syms["d2"]),
+        pStarFormula=str(syms["p_star"]),
+        objective_latex=latex(syms["pi"]),
+        d1_latex=latex(syms["dpi"]),
+        d2_latex=latex(syms["d2"]),
+        pStarFormula_latex=latex(syms["p_star"]),
+    )
+
+
+def _load_derivation_strings():
+    """
+    Lê as strings da derivação de derivation.json; se o arquivo não existir
+    (ou estiver inválido), calcula com o SymPy.
+    """
+    try:
+        with open(DERIVATION_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _compute_derivation_strings()
+
+
+def write_derivation_file(path: Path = DERIVATION_PATH):
+    """
+    Regenera derivation.json a partir do modelo simbólico.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(_compute_derivation_strings(), f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+
+# Strings da derivação dependem só dos símbolos, então são geradas uma única vez
+DERIVATION_STRINGS = _load_derivation_strings()
+
+
+# ----------------------------------------------------------------------
+# Núcleo numérico compilado (Numba): forma fechada de p*, q, lucro etc.
+# ----------------------------------------------------------------------
+@njit(cache=True, fastmath=True)
+def _solve_core(alpha, beta, c, F, pMin, pMax):
+    """
+    Avalia o modelo em forma fechada:
+
+        p* = (alpha + beta * c) / (2 * beta), limitado a [pMin, pMax]
+
+    Retorna (p_opt, q_opt, lucro, receita, margem, elasticidade, used_boundary).
+    """
+    p_star = (alpha + beta * c) / (2.0 * beta)
+    p_opt = min(max(p_star, pMin), pMax)
+    q_opt = max(0.0, alpha - beta * p_opt)
+    revenue = p_opt * q_opt
+    profit = revenue - (F + c * q_opt)
+    margin = (revenue - c * q_opt) / revenue if revenue > 0 else 0.0
+    elasticity = (-beta * p_opt) / (alpha - beta * p_opt) if q_opt > 0 else 0.0
+    used_boundary = math.fabs(p_opt - p_star) > 1e-12
+    return p_opt, q_opt, profit, revenue, margin, elasticity, used_boundary
 
 
 # ----------------------------------------------------------------------
 # Serviço de otimização usando SymPy
 # ----------------------------------------------------------------------
-def optimize_with_sympy(req: OptimizeRequest) -> OptimizeResponse:
+def optimize_with_sympy(req: OptimizeRequest) -> dict:
     """
-    Recebe um OptimizeRequest (alpha, beta, c, F, pMin, pMax) e
-    devolve um OptimizeResponse com o preço ótimo e métricas associadas.
+    Recebe um OptimizeRequest (alpha, beta, c, F, pMin, pMax) e devolve
+    um dict no formato de OptimizeResponse com o preço ótimo e métricas
+    associadas (sem construir o modelo Pydantic de saída).
     """
     if req.beta <= 0:
         raise BadRequest("beta deve ser > 0 (demanda precisa cair quando o preço sobe).")
     if req.pMin > req.pMax:
         raise BadRequest("pMax deve ser >= pMin.")
 
-    p, alpha_s, beta_s, c_s, F_s = SYMS["syms"]
-
-    # Fórmula simbólica de p*
-    p_star_expr = SYMS["p_star"]
-    if p_star_expr is None:
-        raise BadRequest("Não foi possível determinar simbolicamente o preço ótimo.")
-
-    # Substitui parâmetros na fórmula de p*
-    p_star_num = float(
-        p_star_expr.subs(
-            {
-                alpha_s: req.alpha,
-                beta_s: req.beta,
-                c_s: req.c,
-            }
-        ).evalf()
-    )
+    return _optimize_cached(req.alpha, req.beta, req.c, req.F, req.pMin, req.pMax)
+
+
+@lru_cache(maxsize=4096)
+def _optimize_cached(
+    alpha: float, beta: float, c: float, F: float, pMin: float, pMax: float
+) -> dict:
+    """
+    Resultado memoizado pelos 6 parâmetros: requisições repetidas (mesmos
+    valores na tela) não recalculam nada. O dict devolvido é compartilhado
+    entre chamadas e não deve ser alterado; a derivação é sempre o mesmo
+    DERIVATION_STRINGS.
+    """
+    # Núcleo numérico compilado (p*, q, lucro, margem, elasticidade);
+    # o Numba já devolve float/bool nativos do Python
+    (
+        p_opt,
+        q_opt,
+        profit_opt,
+        revenue,
+        margin,
+        elasticity,
+        used_boundary,
+    ) = _solve_core(alpha, beta, c, F, pMin, pMax)
+
+    return {
+        "pOpt": p_opt,
+        "qOpt": q_opt,
+        "profitOpt": profit_opt,
+        "revenue": revenue,
+        "margin": margin,
+        "elasticity": elasticity,
+        "usedBoundary": used_boundary,
+        "derivation": DERIVATION_STRINGS,
+    }
 
-    # Respeita domínio [pMin, pMax]
-    p_opt = min(max(p_star_num, req.pMin), req.pMax)
-    used_boundary = abs(p_opt - p_star_num) > 1e-12
-
-    # Demanda ótima
-    q_expr = SYMS["q"]
-    q_opt = float(
-        max(
-            0.0,
-            q_expr.subs(
-                {alpha_s: req.alpha, beta_s: req.beta, p: p_opt}
-            ).evalf(),
-        )
-    )
 
-    # Receita e lucro
+# ----------------------------------------------------------------------
+# Serviço de otimização em lote (NumPy vetorizado)
+# ----------------------------------------------------------------------
+def optimize_batch(
+    alpha: np.ndarray,
+    beta: np.ndarray,
+    c: np.ndarray,
+    F: np.ndarray,
+    pMin: np.ndarray,
+    pMax: np.ndarray,
+):
+    """
+    Versão vetorizada de optimize_with_sympy: cada argumento é um
+    np.ndarray[float64] e o cenário i é (alpha[i], beta[i], ..., pMax[i]).
+
+    Retorna uma tupla de arrays:
+        (p_opt, q_opt, profit, revenue, margin, elasticity, used_boundary).
+    """
+    p_star = (alpha + beta * c) / (2.0 * beta)
+    p_opt = np.clip(p_star, pMin, pMax)
+    q_opt = np.maximum(0.0, alpha - beta * p_opt)
     revenue = p_opt * q_opt
-    profit_opt = revenue - (req.F + req.c * q_opt)
+    profit = revenue - (F + c * q_opt)
+
+    # np.where avalia os dois ramos; silencia as divisões por zero descartadas
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.where(revenue > 0, (revenue - c * q_opt) / revenue, 0.0)
+        elasticity = np.where(
+            q_opt > 0, (-beta * p_opt) / (alpha - beta * p_opt), 0.0
+        )
 
-    # Margem média (só custo variável)
-    margin = (revenue - req.c * q_opt) / revenue if revenue > 0 else 0.0
+    used_boundary = np.abs(p_opt - p_star) > 1e-12
+    return p_opt, q_opt, profit, revenue, margin, elasticity, used_boundary
 
-    # Elasticidade-preço da demanda em p_opt
-    elasticity = (
-        (-req.beta * p_opt) / (req.alpha - req.beta * p_opt)
-        if q_opt > 0
-        else 0.0
-    )
 
-    # Strings simbólicas e LaTeX
-    pi_str = str(SYMS["pi"])
-    d1_str = str(SYMS["dpi"])
-    d2_str = str(SYMS["d2"])
-    pstar_str = str(p_star_expr)
-
-    pi_latex = latex(SYMS["pi"])
-    d1_latex = latex(SYMS["dpi"])
-    d2_latex = latex(SYMS["d2"])
-    pstar_latex = latex(p_star_expr)
-
-    deriv = Derivation(
-        objective=pi_str,
-        d1=d1_str,
-        d2=d2_str,
-        pStarFormula=pstar_str,
-        objective_latex=pi_latex,
-        d1_latex=d1_latex,
-        d2_latex=d2_latex,
-        pStarFormula_latex=pstar_latex,
+def optimize_batch_request(req: OptimizeBatchRequest) -> dict:
+    """
+    Recebe um OptimizeBatchRequest (listas de alpha, beta, c, F, pMin, pMax,
+    já validadas pelo modelo) e devolve um dict de arrays no formato de
+    OptimizeBatchResponse.
+    """
+    alpha, beta, c, F, pMin, pMax = (
+        np.asarray(v, dtype=np.float64)
+        for v in (req.alpha, req.beta, req.c, req.F, req.pMin, req.pMax)
     )
 
-    return OptimizeResponse(
-        pOpt=p_opt,
-        qOpt=q_opt,
-        profitOpt=float(profit_opt),
-        revenue=float(revenue),
-        margin=float(margin),
-        elasticity=float(elasticity),
-        usedBoundary=used_boundary,
-        derivation=deriv,
-    )
+    (
+        p_opt,
+        q_opt,
+        profit_opt,
+        revenue,
+        margin,
+        elasticity,
+        used_boundary,
+    ) = optimize_batch(alpha, beta, c, F, pMin, pMax)
+
+    return {
+        "pOpt": p_opt,
+        "qOpt": q_opt,
+        "profitOpt": profit_opt,
+        "revenue": revenue,
+        "margin": margin,
+        "elasticity": elasticity,
+        "usedBoundary": used_boundary,
+    }
 
 
 # ----------------------------------------------------------------------
 # Serviço de ajuste linear da demanda (OLS)
 # ----------------------------------------------------------------------
-def fit_linear(pontos: List[FitPoint]) -> FitResponse:
+@njit(cache=True, fastmath=True)
+def _ols_one_pass(p, q):
+    """
+    Médias e somas de produtos centrados (Welford) em uma única passada:
+
+        Cpp = Σ (p - p̄)²,  Cpq = Σ (p - p̄)(q - q̄),  Cqq = Σ (q - q̄)²
+
+    Retorna (p̄, q̄, Cpp, Cpq, Cqq).
+    """
+    n = p.shape[0]
+    mp = 0.0
+    mq = 0.0
+    Cpp = 0.0
+    Cpq = 0.0
+    Cqq = 0.0
+    for i in range(n):
+        dp = p[i] - mp
+        dq = q[i] - mq
+        mp += dp / (i + 1)
+        mq += dq / (i + 1)
+        Cpp += dp * (p[i] - mp)
+        Cpq += dp * (q[i] - mq)
+        Cqq += dq * (q[i] - mq)
+    return mp, mq, Cpp, Cpq, Cqq
+
+
+# Kernel em C opcional (ols_kernel.c -> libols.so); sem ele, usa o Numba
+_DOUBLE_P = ctypes.POINTER(ctypes.c_double)
+
+try:
+    _OLS_LIB = ctypes.CDLL(str(Path(__file__).with_name("libols.so")))
+    _OLS_LIB.ols.argtypes = [_DOUBLE_P, _DOUBLE_P, ctypes.c_size_t, _DOUBLE_P]
+    _OLS_LIB.ols.restype = None
+except OSError:
+    _OLS_LIB = None
+
+
+def _ols(p: np.ndarray, q: np.ndarray):
+    """
+    Mesma saída de _ols_one_pass; p e q devem ser float64 contíguos.
+    """
+    if _OLS_LIB is None:
+        return _ols_one_pass(p, q)
+
+    out = np.empty(5, dtype=np.float64)
+    _OLS_LIB.ols(
+        p.ctypes.data_as(_DOUBLE_P),
+        q.ctypes.data_as(_DOUBLE_P),
+        p.shape[0],
+        out.ctypes.data_as(_DOUBLE_P),
+    )
+    return tuple(out.tolist())
+
+
+def fit_linear(prices: np.ndarray, quantities: np.ndarray) -> FitResponse:
     """
     Ajusta uma reta q = intercept + slope * price aos dados (preço, quantidade)
     usando mínimos quadrados, e converte para o modelo:
@@ -160,23 +324,19 @@ def fit_linear(pontos: List[FitPoint]) -> FitResponse:
 
     Retorna alpha, beta, slope, intercept, r2.
     """
-    n = len(pontos)
+    if prices.shape != quantities.shape:
+        raise BadRequest("prices e quantities devem ter o mesmo tamanho.")
+
+    n = prices.shape[0]
     if n < 2:
         raise BadRequest("Forneça pelo menos 2 pares (preço, quantidade).")
 
-    # Somatórios básicos
-    sumP = sum(pt.price for pt in pontos)
-    sumQ = sum(pt.quantity for pt in pontos)
-    sumPP = sum(pt.price * pt.price for pt in pontos)
-    sumPQ = sum(pt.price * pt.quantity for pt in pontos)
+    # Vetores contíguos de preços e quantidades
+    p = np.ascontiguousarray(prices, dtype=np.float64)
+    q = np.ascontiguousarray(quantities, dtype=np.float64)
 
-    # Médias
-    meanP = sumP / n
-    meanQ = sumQ / n
-
-    # Sxx e Sxy
-    sxx = sumPP - n * meanP * meanP
-    sxy = sumPQ - n * meanP * meanQ
+    # Médias, Sxx, Sxy e Syy em uma passada
+    meanP, meanQ, sxx, sxy, syy = _ols(p, q)
 
     if abs(sxx) < 1e-12:
         raise BadRequest("Variância de preços ~ 0 (todos os preços são iguais).")
@@ -186,11 +346,8 @@ def fit_linear(pontos: List[FitPoint]) -> FitResponse:
     intercept = meanQ - slope * meanP
 
     # R²
-    ss_tot = sum((pt.quantity - meanQ) ** 2 for pt in pontos)
-    ss_res = sum(
-        (pt.quantity - (intercept + slope * pt.price)) ** 2
-        for pt in pontos
-    )
+    ss_tot = syy
+    ss_res = syy - slope * sxy
     r2 = 1 - (ss_res / ss_tot) if ss_tot > 0 else 0.0
 
     # Conversão para q(p) = alpha - beta * p
@@ -210,3 +367,19 @@ def fit_linear(pontos: List[FitPoint]) -> FitResponse:
         intercept=float(intercept),
         r2=float(r2),
     )
+
+
+# ----------------------------------------------------------------------
+# Aquecimento do JIT: compila (ou carrega do cache) os kernels Numba no
+# import, para o primeiro request não pagar esse custo.
+# JIT_WARMUP=0 desliga (útil ao iterar localmente).
+# ----------------------------------------------------------------------
+if os.environ.get("JIT_WARMUP", "1") != "0":
+    _solve_core(100.0, 1.0, 10.0, 5.0, 0.0, 1000.0)
+    _ols_one_pass(np.array([1.0, 2.0]), np.array([3.0, 4.0]))
+
+
+if __name__ == "__main__":
+    # python service.py -> regenera derivation.json
+    write_derivation_file()
+    print("Derivação salva em", DERIVATION_PATH)